@@ -64,10 +64,10 @@ const Explore = () => {
       try {
         const res = await getData("/available-filters");
 
-        const cleanedRaw = res.raw.map((r: any) => ({
-          state: cleanName(r.state),
-          district: cleanName(r.district),
-          block: cleanName(r.block),
+        const cleanedRaw = res.raw.map(([state, district, block]: string[]) => ({
+          state: cleanName(state),
+          district: cleanName(district),
+          block: cleanName(block),
         }));
 
         setRawFilters(cleanedRaw);
@@ -55,10 +55,10 @@ const Report = () => {
         const res = await getData("/available-filters");
 
         // Build raw filter rows (state, district, block)
-        const cleanedRaw = (res.raw || []).map((r: any) => ({
-          state: cleanName(r.state),
-          district: cleanName(r.district),
-          block: cleanName(r.block),
+        const cleanedRaw = (res.raw || []).map(([state, district, block]: string[]) => ({
+          state: cleanName(state),
+          district: cleanName(district),
+          block: cleanName(block),
         }));
 
         setRawFilters(cleanedRaw);
@@ -1,14 +1,28 @@
-from fastapi import FastAPI, Query, HTTPException, status, Request
+from fastapi import FastAPI, Query, HTTPException, status, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
-import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
 import os
+import gzip
+import shutil
+import tempfile
+import mimetypes
+import anyio
+import hashlib
+import orjson
 from functools import lru_cache
 import logging
-from services.qa import build_index, search as qa_search
+from services.qa import build_index, load_index, search as qa_search
 from services.report import generate_report_pdf
 from pydantic import BaseModel
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.concurrency import run_in_threadpool
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+import threading
 from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 
@@ -32,46 +46,108 @@ class ReportRequest(BaseModel):
     includeComparisons: bool = False
     includeRecommendations: bool = True
 
-def clean_column(val):
-    if isinstance(val, str):
-        return val.split("_")[0]
-    return val
+FILTER_COLUMNS = ["state", "district", "block", "season"]
+
+# Data responses only change when the data file does
+CACHE_CONTROL = "public, max-age=86400, immutable"
+# The large JSON payloads are encoded with orjson directly into cached bodies
+_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _data_path():
+    BASE_DIR = Path(__file__).resolve().parent.parent
+    PARQUET_PATH = BASE_DIR / "data" / "atalbhujal_water_levels.parquet"
+    DATA_PATH = BASE_DIR / "data" / "atalbhujal_water_levels.csv"
+
+    # Prefer the parquet written by preprocess.py, fall back to the CSV
+    if os.path.exists(PARQUET_PATH):
+        return PARQUET_PATH
+    if os.path.exists(DATA_PATH):
+        return DATA_PATH
+    raise FileNotFoundError(f"CSV not found at {DATA_PATH}")
+
+
+@lru_cache(maxsize=1)
+def _data_version():
+    return os.path.getmtime(_data_path())
+
+
+def _etag(value):
+    return '"' + hashlib.blake2s(orjson.dumps(value)).hexdigest() + '"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
 
 # Optimized DataFrame loader
 @lru_cache(maxsize=1)
 def get_water_levels_df():
-    logging.info("Loading groundwater CSV data...")
-    
-    BASE_DIR = Path(__file__).resolve().parent.parent
-    DATA_PATH = BASE_DIR / "data" / "atalbhujal_water_levels.csv"
+    logging.info("Loading groundwater data...")
+
+    path = _data_path()
+    if path.suffix == ".parquet":
+        lazy = pl.scan_parquet(path)
+    else:
+        # Levels contain markers like "Dry", keep them as strings
+        lazy = pl.scan_csv(path, schema_overrides={"water_level_m_bgl": pl.String})
+
+    # Clean columns ("Gujarat_24" -> "Gujarat") with native string kernels
+    df = lazy.with_columns(
+        pl.col("state").str.split("_").list.first(),
+        pl.col("district").str.split("_").list.first(),
+        pl.col("block").str.split("_").list.first(),
+    ).collect()
+
+    df = df.to_pandas(use_pyarrow_extension_array=True)
 
-    
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError(f"CSV not found at {DATA_PATH}")
-    
-    df = pd.read_csv(DATA_PATH)
+    # Lowercased copies used by the /water-level filters
+    for col in FILTER_COLUMNS:
+        df[f"_{col}_lc"] = df[col].str.lower()
 
-    # Clean columns
-    df["state"] = df["state"].apply(clean_column)
-    df["district"] = df["district"].apply(clean_column)
-    df["block"] = df["block"].apply(clean_column)
+    # Alias so frontend can use "water_level" (reports still read water_level_m_bgl)
+    df["water_level"] = df["water_level_m_bgl"]
 
     return df
 
 
-# Build KB index on startup
-SECTIONS, VEC, MAT = build_index("kb")
+# Immutable Arrow snapshot used for substring (exact=false) filtering
+@lru_cache(maxsize=1)
+def get_water_levels_table():
+    return pa.Table.from_pandas(get_water_levels_df(), preserve_index=False)
+
+
+# Exact-match view: sorted (state, district, block) index for O(log N) slicing
+@lru_cache(maxsize=1)
+def get_water_levels_index():
+    df = get_water_levels_df()
+    df = df.astype({"state": "category", "district": "category", "block": "category",
+                    "season": "category", "_season_lc": "category"})
+    # A few rows have no block; null keys would break the lexsort
+    keys = ["_state_lc", "_district_lc", "_block_lc"]
+    df[keys] = df[keys].fillna("")
+    return df.set_index(keys).sort_index()
+
+
+# Load the KB index prebuilt by scripts/build_kb_index.py, or build it on startup
+try:
+    SECTIONS, VEC, MAT = load_index("kb_index")
+except FileNotFoundError:
+    SECTIONS, VEC, MAT = build_index("kb")
 
 @app.get("/")
 def root():
     return {"message": "Welcome to Atal Bhujal Groundwater API"}
 
-@app.get("/available-filters")
-def get_available_filters():
+# The data is static, so the filter options are built once and reused
+@lru_cache(maxsize=1)
+def _available_filters_payload():
     df = get_water_levels_df()
 
-    # Cleaned raw rows to help frontend build dependent dropdowns
-    raw_rows = df[["state", "district", "block"]].dropna().to_dict(orient="records")
+    # Distinct (state, district, block) combos for the dependent dropdowns
+    combos = df[["state", "district", "block"]].dropna().drop_duplicates()
+    raw_rows = list(combos.itertuples(index=False, name=None))
 
     return {
         "states": sorted(df["state"].dropna().unique().tolist()),
@@ -84,8 +160,96 @@ def get_available_filters():
         "raw": raw_rows
     }
 
-# Serve report files from /reports folder
-app.mount("/reports", StaticFiles(directory="reports"), name="reports")
+@lru_cache(maxsize=1)
+def _available_filters_body() -> bytes:
+    return orjson.dumps(_available_filters_payload(), option=_JSON_OPTIONS)
+
+@lru_cache(maxsize=1)
+def _available_filters_etag():
+    return _etag(_available_filters_payload())
+
+@app.get("/available-filters")
+def get_available_filters(request: Request):
+    etag = _available_filters_etag()
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(_available_filters_body(), media_type="application/json", headers=headers)
+
+REPORT_CACHE_CONTROL = "public, max-age=3600"
+
+
+def write_gzip_copy(path: str) -> str:
+    """Write `path + ".gz"` next to a generated file so it can be served precompressed."""
+    gz_path = path + ".gz"
+    # Compress into a temp file in the same directory and rename it into place, so
+    # readers never see a partial sidecar and concurrent writers don't interleave
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".gz.tmp")
+    try:
+        with open(path, "rb") as src, os.fdopen(fd, "wb") as raw, \
+                gzip.GzipFile(fileobj=raw, mode="wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, gz_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return gz_path
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows gzip: listed (or covered by "*")
+    with a non-zero q-value. An explicit gzip entry takes precedence over "*".
+    """
+    qualities = {}
+    for entry in accept_encoding.split(","):
+        coding, *params = entry.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that also sends Cache-Control (ETag/Last-Modified come built in)
+    and serves a fresh `.gz` sidecar to clients that accept gzip.
+    """
+
+    def __init__(self, *args, max_age: int = 3600, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = f"public, max-age={max_age}"
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", self.cache_control)
+        return response
+
+    async def get_response(self, path, scope):
+        if _accepts_gzip(Headers(scope=scope).get("accept-encoding", "")):
+            _, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            _, gz_stat = await anyio.to_thread.run_sync(self.lookup_path, path + ".gz")
+            # Only use the sidecar if it was written after the current file
+            if stat_result and gz_stat and gz_stat.st_mtime >= stat_result.st_mtime:
+                response = await super().get_response(path + ".gz", scope)
+                response.headers["Content-Encoding"] = "gzip"
+                response.headers["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                response.headers["Vary"] = "Accept-Encoding"
+                return response
+        response = await super().get_response(path, scope)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+# Serve report files from /reports folder. Reports are regenerated in place,
+# so they are revalidated hourly rather than marked immutable
+app.mount("/reports", CachedStaticFiles(directory="reports", max_age=3600), name="reports")
+
 @app.get("/report")
 def build_report(state: str, district: str, block: str):
     """
@@ -101,17 +265,36 @@ def build_report(state: str, district: str, block: str):
     if not os.path.exists(pdf_path):
         logging.error("Failed to generate report PDF file.")
         return {"message": "Failed to generate report"}
+    write_gzip_copy(pdf_path)
     filename = os.path.basename(pdf_path)
     logging.info(f"Returning PDF file: {filename}")
-    return FileResponse(pdf_path, media_type="application/pdf", filename=filename)
+    return FileResponse(pdf_path, media_type="application/pdf", filename=filename,
+                        headers={"Cache-Control": REPORT_CACHE_CONTROL})
+
+# Responses derive from static data, so repeated queries are served from
+# per-process TTL caches (a shared store like Redis would be needed to share
+# them across workers)
+_ASK_CACHE = TTLCache(maxsize=4096, ttl=3600)
+# Holds encoded JSON bodies sized in bytes (the whole table is ~8 MB) rather
+# than record dicts, which cost ~4.5x that in memory per worker
+_WATER_LEVEL_CACHE = TTLCache(maxsize=64 * 1024 * 1024, ttl=3600, getsizeof=len)
+_EMPTY_BODY = orjson.dumps([])
 
+
+@cached(_ASK_CACHE, key=lambda query, k: hashkey(query.lower().strip(), k), lock=threading.Lock())
+def cached_search(query: str, k: int):
+    return qa_search(query, k=k)
+
+
+# Sync endpoints (/report, /ask, /water-level, ...) stay plain `def`:
+# FastAPI already runs them in its threadpool, off the event loop.
 @app.get("/ask")
 def ask(query: str = Query(..., min_length=3), k: int = 5, top: bool = False):
     """
     Semantic-ish search over local markdown KB. Returns top-k snippets with source.
     If 'top' is True, returns only the best matching answer.
     """
-    results = qa_search(query, k=k)
+    results = cached_search(query, k)
     if not results:
         return {"message": "No matches found"}
     if top:
@@ -121,6 +304,56 @@ def ask(query: str = Query(..., min_length=3), k: int = 5, top: bool = False):
 from fastapi import status
 from typing import Optional
 
+def _water_level_key(state, district, block, year, season, exact):
+    return hashkey(*(v.lower() if v else None for v in (state, district, block, season)), year, exact)
+
+
+@cached(_WATER_LEVEL_CACHE, key=_water_level_key, lock=threading.Lock())
+def _water_level_body(state, district, block, year, season, exact) -> bytes:
+    return orjson.dumps(_water_level_records(state, district, block, year, season, exact), option=_JSON_OPTIONS)
+
+
+def _water_level_records(state, district, block, year, season, exact):
+    if not exact:
+        return _substring_water_level_records(state, district, block, year, season)
+
+    # Dropdown values from the frontend match a location exactly
+    indexed = get_water_levels_index()
+    key = tuple(v.lower() if v else slice(None) for v in (state, district, block))
+    try:
+        data = indexed.loc[key, :].reset_index(drop=True)
+    except KeyError:
+        data = indexed.iloc[0:0]
+
+    if season:
+        data = data[data["_season_lc"] == season.lower()]
+
+    if year:
+        data = data[data["year"] == year]
+
+    # The location keys went into the index; only the season key is a column
+    return data.drop(columns=["_season_lc"]).to_dict(orient="records")
+
+
+def _substring_water_level_records(state, district, block, year, season):
+    # One combined Arrow predicate over the immutable snapshot, no pandas masks
+    table = get_water_levels_table()
+    mask = None
+    for col, value in (("state", state), ("district", district), ("block", block), ("season", season)):
+        if value:
+            cond = pc.match_substring(table[f"_{col}_lc"], value.lower())
+            mask = cond if mask is None else pc.and_(mask, cond)
+
+    if year:
+        cond = pc.equal(table["year"], year)
+        mask = cond if mask is None else pc.and_(mask, cond)
+
+    if mask is not None:
+        table = table.filter(mask)
+
+    return table.drop_columns([f"_{col}_lc" for col in FILTER_COLUMNS]).to_pylist()
+
+
 @app.get(
     "/water-level",
     responses={
@@ -131,40 +364,26 @@ from typing import Optional
     },
 )
 def get_water_level(
+    request: Request,
     state: str = Query(None),
     district: str = Query(None),
     block: str = Query(None),
     year: int = Query(None),
     season: str = Query(None),
+    exact: bool = Query(True),
 ):
-    data = get_water_levels_df().copy()
+    # Checked before any filtering so revalidations skip the lookup entirely
+    etag = _etag([*_water_level_key(state, district, block, year, season, exact), _data_version()])
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
 
-    if state:
-        data = data[data["state"].str.lower().str.contains(state.lower())]
+    body = _water_level_body(state, district, block, year, season, exact)
 
-    if district:
-        data = data[data["district"].str.lower().str.contains(district.lower())]
-
-    if block:
-        data = data[data["block"].str.lower().str.contains(block.lower())]
-
-    if year:
-        data = data[data["year"] == year]
-
-    if season:
-        data = data[data["season"].str.lower().str.contains(season.lower())]
-
-    if data.empty:
+    if body == _EMPTY_BODY:
         raise HTTPException(status_code=404, detail="No water level data found")
 
-    records = data.to_dict(orient="records")
-
-# Normalize column name so frontend can use "water_level"
-    for r in records:
-        if "water_level_m_bgl" in r:
-            r["water_level"] = r["water_level_m_bgl"]
-
-    return records
+    return Response(body, media_type="application/json", headers=headers)
 
 
 class AskRequest(BaseModel):
@@ -180,7 +399,8 @@ async def ask_ai(payload: AskRequest):
     Uses QA search system and returns best matching snippet.
     """
     try:
-        results = qa_search(payload.query, k=payload.k)
+        # Search is CPU-bound; keep it off the event loop
+        results = await run_in_threadpool(cached_search, payload.query, payload.k)
 
         if not results:
             return {"answer": "I could not find information related to your query."}
@@ -213,9 +433,11 @@ async def generate_report(payload: ReportRequest):
     Accepts JSON body and returns a success message with PDF path.
     """
     try:
-        df = get_water_levels_df()
+        df = await run_in_threadpool(get_water_levels_df)
 
-        pdf_path = generate_report_pdf(
+        # matplotlib/reportlab rendering is CPU-bound; keep it off the event loop
+        pdf_path = await run_in_threadpool(
+    generate_report_pdf,
     df,
     payload.state,
     payload.district,
@@ -226,6 +448,8 @@ async def generate_report(payload: ReportRequest):
     include_comparisons=payload.includeComparisons,
     include_recommendations=payload.includeRecommendations,
 )
+        # Precompressed copy for the /reports mount
+        await run_in_threadpool(write_gzip_copy, pdf_path)
 
         return {
         "message": "Report generated successfully!",
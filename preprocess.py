@@ -1,42 +1,70 @@
-import pandas as pd
+import polars as pl
+import polars.selectors as cs
 import os
+import shutil
+import tempfile
 
 RAW_CSV = "Atal_Bhujal_Groundwater_Data.csv"
 OUTPUT_FILE = "data/atalbhujal_water_levels.csv"
+PARQUET_FILE = "data/atalbhujal_water_levels.parquet"
 
-# Load CSV
-df = pd.read_csv(RAW_CSV, encoding="latin1")
-df.columns = df.columns.str.strip()
+# pandas.read_csv's default missing-value markers (empty cells are null in polars
+# already), so the same rows count as missing and get dropped
+NA_VALUES = [
+    "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
 
-# Keep only relevant columns
-df = df[['State_Name_With_LGD_Code', 'District_Name_With_LGD_Code', 'Block_Name_With_LGD_Code'] +
-        [col for col in df.columns if 'Pre-monsoon' in col or 'Post-monsoon' in col]]
+ID_COLUMNS = ['State_Name_With_LGD_Code', 'District_Name_With_LGD_Code', 'Block_Name_With_LGD_Code']
 
-# Melt water level columns
-df_melt = df.melt(id_vars=['State_Name_With_LGD_Code', 'District_Name_With_LGD_Code', 'Block_Name_With_LGD_Code'],
-                  var_name='month_year', value_name='water_level_m_bgl')
+# The raw export is latin1; polars only reads UTF-8, so stream a UTF-8 copy to a
+# temp file first (a lossy UTF-8 read would turn every accented name into U+FFFD).
+# The directory is also removed at exit if a later step fails
+tmp_dir = tempfile.TemporaryDirectory()
+UTF8_CSV = os.path.join(tmp_dir.name, "raw_utf8.csv")
+with open(RAW_CSV, encoding="latin1", newline="") as src, \
+        open(UTF8_CSV, "w", encoding="utf-8", newline="") as dst:
+    shutil.copyfileobj(src, dst, 1 << 20)
+
+# Lazily scan CSV (read everything as text, levels contain markers like "Dry")
+lf = pl.scan_csv(UTF8_CSV, infer_schema=False, null_values=NA_VALUES)
+lf = lf.select(pl.all().name.map(str.strip))
+
+# Keep only relevant columns and melt water level columns
+lf = lf.select(ID_COLUMNS + [cs.matches("Pre-monsoon|Post-monsoon")]).unpivot(
+    index=ID_COLUMNS, variable_name='month_year', value_name='water_level_m_bgl'
+)
 
 # Extract 'season' and 'year' from column names
-df_melt['season'] = df_melt['month_year'].apply(lambda x: 'Pre-monsoon' if 'Pre-monsoon' in x else 'Post-monsoon')
-df_melt['year'] = df_melt['month_year'].str.extract('(\d{4})')
-df_melt = df_melt.drop(columns=['month_year'])
+lf = lf.with_columns(
+    pl.when(pl.col('month_year').str.contains('Pre-monsoon', literal=True))
+    .then(pl.lit('Pre-monsoon'))
+    .otherwise(pl.lit('Post-monsoon'))
+    .alias('season'),
+    pl.col('month_year').str.extract(r'(\d{4})').cast(pl.Int64).alias('year'),
+).drop('month_year')
 
 # Rename columns
-df_melt = df_melt.rename(columns={
+lf = lf.rename({
     'State_Name_With_LGD_Code': 'state',
     'District_Name_With_LGD_Code': 'district',
     'Block_Name_With_LGD_Code': 'block'
 })
 
 # Remove rows with missing water levels
-df_melt = df_melt.dropna(subset=['water_level_m_bgl'])
+lf = lf.drop_nulls('water_level_m_bgl')
 
 # Create data folder if not exists
 if not os.path.exists("data"):
     os.makedirs("data")
 
-# Save cleaned CSV
-df_melt.to_csv(OUTPUT_FILE, index=False)
+# Stream to parquet (read by the API), then export the CSV copy from it
+try:
+    lf.sink_parquet(PARQUET_FILE, compression="zstd")
+finally:
+    tmp_dir.cleanup()
+pl.scan_parquet(PARQUET_FILE).sink_csv(OUTPUT_FILE)
 
+print(f"✅ Parquet saved to {PARQUET_FILE}")
 print(f"✅ Clean CSV saved to {OUTPUT_FILE}")
-print("📊 Preview:\n", df_melt.head())
+print("📊 Preview:\n", pl.scan_parquet(PARQUET_FILE).head().collect())
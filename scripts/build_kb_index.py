@@ -0,0 +1,21 @@
+"""
+Prebuilds the knowledge base search index into kb_index/ so every API worker
+loads it at startup instead of re-reading and re-tokenizing kb/.
+
+Run from the repository root (e.g. during the container build):
+    python scripts/build_kb_index.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.qa import build_index, save_index
+
+KB_DIR = "kb"
+INDEX_DIR = "kb_index"
+
+sections, _, matrix = build_index(KB_DIR)
+save_index(INDEX_DIR)
+
+print(f"✅ Indexed {len(sections)} sections ({matrix.shape[1]} features) into {INDEX_DIR}/")
@@ -1,30 +1,54 @@
 """
-TF-IDF based semantic search over markdown knowledge base sections.
+Semantic search over markdown knowledge base sections.
+
+Uses sentence embeddings in a FAISS HNSW index when sentence-transformers and
+faiss are installed, and hashed bag-of-words cosine search otherwise.
 """
 import os
 import glob
 import re
+from pathlib import Path
 from typing import List, Dict, Tuple, Any
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+try:
+    import faiss
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional dense backend
+    faiss = None
+    SentenceTransformer = None
+
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+# Smaller KBs are not worth loading the embedding model for
+DENSE_MIN_SECTIONS = 10
+
+# '## ' subheadings, captured so the split keeps them
+_HEADING_RE = re.compile(r'(^## .*)', re.MULTILINE)
+
+# Files written by save_index / read by load_index
+_SECTIONS_FILE = 'sections.joblib'
+_MATRIX_FILE = 'matrix.npz'
+_DENSE_FILE = 'dense.faiss'
 
 # Global cache
 _KB_CACHE = {}
 
 
-def build_index(kb_dir: str) -> Tuple[pd.DataFrame, TfidfVectorizer, Any]:
+def build_index(kb_dir: str) -> Tuple[List[Dict[str, str]], HashingVectorizer, Any]:
     """
     Walks the kb_dir, reads all .md files, splits into sections by '## ' subheadings.
-    Returns (sections_df, vectorizer, matrix)
+    Returns (sections, vectorizer, matrix) with L2-normalized matrix rows,
+    where sections is a list of {file, heading, snippet} dicts.
     """
     sections = []
     for md_path in glob.glob(os.path.join(kb_dir, '*.md')):
-        with open(md_path, encoding='utf-8') as f:
-            text = f.read()
+        text = Path(md_path).read_text(encoding='utf-8')
         file = os.path.basename(md_path)
         # Split by '## ' but keep headings
-        parts = re.split(r'(^## .*)', text, flags=re.MULTILINE)
+        parts = _HEADING_RE.split(text)
         if len(parts) < 2:
             # No subheadings, treat whole file as one section
             sections.append({'file': file, 'heading': file, 'snippet': text.strip()})
@@ -34,17 +58,73 @@ def build_index(kb_dir: str) -> Tuple[pd.DataFrame, TfidfVectorizer, Any]:
                 heading = parts[i].strip()
                 snippet = parts[i+1].strip() if i+1 < len(parts) else ''
                 sections.append({'file': file, 'heading': heading, 'snippet': snippet})
-    df = pd.DataFrame(sections)
-    if df.empty:
+    # Empty sections carry no information and would waste top-k slots
+    sections = [s for s in sections if s['snippet']]
+    snippets = [s['snippet'] for s in sections]
+    # Stateless hashing: no vocabulary to fit. Rows come out unit-length,
+    # so cosine similarity is a plain sparse dot product
+    vectorizer = HashingVectorizer(n_features=2**18, alternate_sign=False, norm='l2', stop_words='english')
+    if snippets:
+        matrix = vectorizer.transform(snippets)
+    else:
         # Handle empty KB
-        df = pd.DataFrame([{'file': '', 'heading': '', 'snippet': ''}])
-    vectorizer = TfidfVectorizer(stop_words='english')
-    matrix = vectorizer.fit_transform(df['snippet'].fillna(''))
-    # Cache
-    _KB_CACHE['df'] = df
+        matrix = sparse.csr_matrix((0, vectorizer.n_features))
+    _cache_index(sections, vectorizer, matrix)
+    if _dense_enabled(sections):
+        model = SentenceTransformer(EMBEDDING_MODEL)
+        emb = model.encode(snippets, normalize_embeddings=True, batch_size=64)
+        # Inner product on unit vectors == cosine similarity
+        index = faiss.IndexHNSWFlat(emb.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        index.add(np.asarray(emb, dtype='float32'))
+        _KB_CACHE['model'] = model
+        _KB_CACHE['index'] = index
+    return sections, vectorizer, matrix
+
+
+def save_index(index_dir: str) -> None:
+    """
+    Writes the index built by build_index to index_dir, so API workers can
+    load_index it instead of re-reading and re-tokenizing the KB.
+    """
+    if not _KB_CACHE:
+        raise RuntimeError('KB index not built. Call build_index first.')
+    os.makedirs(index_dir, exist_ok=True)
+    joblib.dump((_KB_CACHE['sections'], _KB_CACHE['vectorizer']), os.path.join(index_dir, _SECTIONS_FILE), compress=0)
+    sparse.save_npz(os.path.join(index_dir, _MATRIX_FILE), _KB_CACHE['matrix'], compressed=False)
+    if 'index' in _KB_CACHE:
+        faiss.write_index(_KB_CACHE['index'], os.path.join(index_dir, _DENSE_FILE))
+
+
+def load_index(index_dir: str) -> Tuple[List[Dict[str, str]], HashingVectorizer, Any]:
+    """
+    Loads an index written by save_index into the search cache.
+    Returns the same (sections, vectorizer, matrix) tuple as build_index.
+    Raises FileNotFoundError if index_dir holds no saved index.
+    """
+    sections, vectorizer = joblib.load(os.path.join(index_dir, _SECTIONS_FILE))
+    matrix = sparse.load_npz(os.path.join(index_dir, _MATRIX_FILE))
+    _cache_index(sections, vectorizer, matrix)
+    dense_path = os.path.join(index_dir, _DENSE_FILE)
+    if _dense_enabled(sections) and os.path.exists(dense_path):
+        _KB_CACHE['model'] = SentenceTransformer(EMBEDDING_MODEL)
+        _KB_CACHE['index'] = faiss.read_index(dense_path)
+    return sections, vectorizer, matrix
+
+
+def _dense_enabled(sections: List[Dict[str, str]]) -> bool:
+    return SentenceTransformer is not None and len(sections) >= DENSE_MIN_SECTIONS
+
+
+def _cache_index(sections: List[Dict[str, str]], vectorizer: HashingVectorizer, matrix: Any) -> None:
+    # Cache plain lists: search only needs positional lookups
+    _KB_CACHE['sections'] = sections
+    _KB_CACHE['snippets'] = [s['snippet'] for s in sections]
+    _KB_CACHE['headings'] = [s['heading'] for s in sections]
+    _KB_CACHE['files'] = [s['file'] for s in sections]
     _KB_CACHE['vectorizer'] = vectorizer
     _KB_CACHE['matrix'] = matrix
-    return df, vectorizer, matrix
+    _KB_CACHE.pop('model', None)
+    _KB_CACHE.pop('index', None)
 
 
 def search(query: str, k: int = 5) -> List[Dict[str, Any]]:
@@ -54,18 +134,30 @@ def search(query: str, k: int = 5) -> List[Dict[str, Any]]:
     """
     if not _KB_CACHE:
         raise RuntimeError('KB index not built. Call build_index first.')
-    vec = _KB_CACHE['vectorizer'].transform([query])
-    sims = cosine_similarity(vec, _KB_CACHE['matrix']).flatten()
-    df = _KB_CACHE['df']
-    top_idx = sims.argsort()[::-1][:k]
+    snippets = _KB_CACHE['snippets']
+    headings = _KB_CACHE['headings']
+    files = _KB_CACHE['files']
+    k = min(k, len(snippets))
+    if k <= 0:
+        return []
+    if 'index' in _KB_CACHE:
+        q = _KB_CACHE['model'].encode([query], normalize_embeddings=True)
+        scores, ids = _KB_CACHE['index'].search(np.asarray(q, dtype='float32'), k)
+        found = ids[0] >= 0
+        top_idx, top_scores = ids[0][found], scores[0][found]
+    else:
+        vec = _KB_CACHE['vectorizer'].transform([query])
+        sims = (_KB_CACHE['matrix'] @ vec.T).toarray().ravel()
+        # Partial selection of the k best, then order only those
+        top_idx = np.argpartition(-sims, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-sims[top_idx])]
+        top_scores = sims[top_idx]
     results = []
-    for idx in top_idx:
-        if not df.iloc[idx]['snippet'].strip():
-            continue
+    for idx, score in zip(top_idx, top_scores):
         results.append({
-            'score': float(sims[idx]),
-            'snippet': df.iloc[idx]['snippet'],
-            'heading': df.iloc[idx]['heading'],
-            'file': df.iloc[idx]['file']
+            'score': float(score),
+            'snippet': snippets[idx],
+            'heading': headings[idx],
+            'file': files[idx]
         })
-    return results
\ No newline at end of file
+    return results
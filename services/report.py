@@ -1,34 +1,237 @@
 import os
 import io
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
 import logging
-from typing import Optional
+import weakref
+from functools import lru_cache
+from typing import BinaryIO, Optional, Tuple, Union
 
 logging.basicConfig(level=logging.INFO)
 
+# Report seasons in display order; the normalized (lowercase) names are the
+# categories of the season column, so a season's position is its integer code
+SEASONS = ["Pre-monsoon", "Post-monsoon"]
+_SEASON_CATEGORIES = [season.lower() for season in SEASONS]
+
+# Columns generate_report_pdf reads from the input dataframe
+REQUIRED_COLUMNS = ["state", "district", "block", "season", "year", "water_level_m_bgl"]
+
+# Chart size as placed in the PDF (points)
+CHART_WIDTH_PT = 450
+CHART_HEIGHT_PT = 250
+
+
+# matplotlib and reportlab are imported on first report, not at API startup
+@lru_cache(maxsize=None)
+def _report_styles():
+    """
+    (styles, table_style) shared across reports: ReportLab rebuilds
+    none of these between calls.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+
+    styles = getSampleStyleSheet()
+    # Grey header row + grid used by every table
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ])
+    return styles, table_style
+
+
+def _chart_template():
+    """
+    (fig, canvas, ax) for the trend chart with the data-independent styling
+    applied; callers only plot the series and set the title and legend.
+    Built fresh per report since figures are not safe to share between threads.
+    """
+    from matplotlib.backends.backend_svg import FigureCanvasSVG
+    from matplotlib.figure import Figure
+
+    # Sized to its 450x250 pt slot in the PDF so it is placed without scaling.
+    # Standalone figure + canvas: no pyplot global figure registry to lock or
+    # clean up when reports render concurrently. Constrained layout fits labels
+    # and the outside legend before the single draw (no measure-then-redraw pass)
+    fig = Figure(figsize=(CHART_WIDTH_PT / 72, CHART_HEIGHT_PT / 72), layout="constrained")
+    canvas = FigureCanvasSVG(fig)
+    ax = fig.subplots()
+    ax.grid(True, which='both', linestyle='--', alpha=0.6)
+    ax.set_xlabel("Year", fontsize=8, fontweight='bold')
+    ax.set_ylabel("Water Level (m bgl)", fontsize=8, fontweight='bold')
+    ax.invert_yaxis()  # Deeper levels shown lower on chart
+    ax.tick_params(axis='x', rotation=45)
+    ax.tick_params(labelsize=7)
+    return fig, canvas, ax
+
 
 def _safe_to_numeric(series):
-    return pd.to_numeric(series, errors="coerce")
+    # float64 so coerced NaNs count as missing for Arrow-backed input too
+    return pd.to_numeric(series, errors="coerce").astype("float64")
+
+
+# Location name before the LGD code suffix; named group so Arrow-backed strings accept it
+_LOCATION_NAME_RE = r"^(?P<name>[^_]*)"
+
+# Location keys per dataframe, keyed by id(df) and dropped once df is collected
+_KEY_CACHE = {}
+
+
+def _location_key(values: pd.Series) -> pd.Categorical:
+    """
+    Lowercased, code-stripped ("Gujarat_24" -> "gujarat") key for each value.
+    The string work runs once per distinct value and is broadcast back to the
+    rows through the factorized codes (missing values stay missing, code -1).
+    """
+    codes, uniques = pd.factorize(values)
+    names = pd.Series(uniques).str.extract(_LOCATION_NAME_RE, expand=False).str.lower()
+    # Distinct raw values can share a key ("Gujarat_24" / "GUJARAT_24")
+    name_codes, categories = pd.factorize(names)
+    lut = np.append(name_codes, -1)  # codes == -1 indexes the trailing -1
+    return pd.Categorical.from_codes(lut[codes], categories=categories)
 
 
-def _format_change(new, old):
+def _prepare_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Lowercased, code-stripped ("Gujarat_24" -> "gujarat") state/district/block
+    keys for df as categoricals, computed once per dataframe object.
+    """
+    keys = _KEY_CACHE.get(id(df))
+    if keys is None:
+        keys = pd.DataFrame({
+            f"_{col}_key": _location_key(df[col])
+            for col in ("state", "district", "block")
+        }, index=df.index)
+        _KEY_CACHE[id(df)] = keys
+        weakref.finalize(df, _KEY_CACHE.pop, id(df), None)
+    return keys
+
+
+def _format_changes(new, old) -> list:
+    """Formats element-wise new-vs-old changes as "+diff (+pct%)" strings."""
+    new = np.asarray(new, dtype=float)
+    old = np.asarray(old, dtype=float)
+    diffs = new - old
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pcts = np.where(old != 0, diffs / old * 100, np.nan)
+    signs = np.where(diffs > 0, "+", "")
+    return [
+        "N/A" if np.isnan(diff)
+        else f"{sign}{diff:.2f}" if np.isnan(pct)
+        else f"{sign}{diff:.2f} ({sign}{pct:.1f}%)"
+        for sign, diff, pct in zip(signs, diffs, pcts)
+    ]
+
+
+def _summarize(year_idx, season_code, levels, n_years, n_seasons):
+    """
+    Single pass over a block's rows, returning per (year, season) row count,
+    measured count, sum, min and max of levels. NaN levels count as rows only.
+    Rows with season code -1 (not a report season) go to an extra last season
+    column, so per-year totals still include them.
+    """
+    rows = np.zeros((n_years, n_seasons + 1), dtype=np.int64)
+    count = np.zeros((n_years, n_seasons + 1), dtype=np.int64)
+    total = np.zeros((n_years, n_seasons + 1))
+    lo = np.full((n_years, n_seasons + 1), np.inf)
+    hi = np.full((n_years, n_seasons + 1), -np.inf)
+    for i in range(len(levels)):
+        y = year_idx[i]
+        s = season_code[i]
+        if s < 0:
+            s = n_seasons
+        rows[y, s] += 1
+        v = levels[i]
+        if np.isnan(v):
+            continue
+        count[y, s] += 1
+        total[y, s] += v
+        if v < lo[y, s]:
+            lo[y, s] = v
+        if v > hi[y, s]:
+            hi[y, s] = v
+    return rows, count, total, lo, hi
+
+
+@lru_cache(maxsize=None)
+def _summary_kernel():
+    """_summarize compiled with numba (optional, cached on disk) or plain Python."""
     try:
-        diff = new - old
-        sign = "+" if diff > 0 else ""
-        pct = (diff / old * 100) if old not in (0, None, pd.NA) else None
-        if pct is None or pd.isna(pct):
-            return f"{sign}{diff:.2f}"
-        return f"{sign}{diff:.2f} ({sign}{pct:.1f}%)"
-    except Exception:
-        return "N/A"
+        from numba import njit
+    except ImportError:
+        return _summarize
+    return njit(cache=True)(_summarize)
+
+
+def _aggregate_levels(data: pd.DataFrame, per_year: bool = True) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    (by_year_season, by_year) mean/min/max/count/sum of water levels for rows
+    with an integer year. Rows outside the report seasons are left out of
+    by_year_season but counted in by_year; count is the number of measured
+    levels, so 0 marks an all-NaN group and such years are dropped from by_year.
+    by_year is None unless per_year is set.
+    """
+    years, year_idx = np.unique(data["year"].to_numpy(), return_inverse=True)
+    seasons = data["_season_norm"].cat.categories
+    season_code = data["_season_norm"].cat.codes.to_numpy()
+    levels = data["water_level_m_bgl"].to_numpy(dtype=np.float64)
+
+    rows, count, total, lo, hi = _summary_kernel()(
+        year_idx.astype(np.int64), season_code, levels, len(years), len(seasons)
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Per (year, season), in sorted (year, season code) order; the trailing
+        # column holds rows without a report season
+        yi, si = np.nonzero(rows[:, :len(seasons)])
+        measured = count[yi, si] > 0
+        by_year_season = pd.DataFrame(
+            {
+                "mean": np.where(measured, total[yi, si] / count[yi, si], np.nan),
+                "min": np.where(measured, lo[yi, si], np.nan),
+                "max": np.where(measured, hi[yi, si], np.nan),
+                "count": count[yi, si],
+                "sum": total[yi, si],
+            },
+            index=pd.MultiIndex.from_arrays(
+                [years[yi], pd.Categorical.from_codes(si, categories=seasons)],
+                names=["year", "_season_norm"],
+            ),
+        )
+
+        if not per_year:
+            return by_year_season, None
+
+        # Per-year stats across seasons (mean weighted by measurement count)
+        year_count = count.sum(axis=1)
+        year_sum = total.sum(axis=1)
+        keep = year_count > 0
+        by_year = pd.DataFrame(
+            {
+                "min": lo.min(axis=1, initial=np.inf)[keep],
+                "max": hi.max(axis=1, initial=-np.inf)[keep],
+                "count": year_count[keep],
+                "sum": year_sum[keep],
+                "mean": year_sum[keep] / year_count[keep],
+            },
+            index=pd.Index(years[keep], name="year"),
+        )
+    return by_year_season, by_year
+
+
+def _season_slice(by_year_season: pd.DataFrame, code: int) -> Optional[pd.DataFrame]:
+    """Per-year stats for one season (its code, i.e. index in SEASONS), or None if it has no rows."""
+    rows = by_year_season.index.codes[1] == code
+    if not rows.any():
+        return None
+    return by_year_season[rows].droplevel("_season_norm")
 
 
 def generate_report_pdf(
@@ -41,7 +244,8 @@ def generate_report_pdf(
     include_trends: bool = True,
     include_comparisons: bool = True,
     include_recommendations: bool = True,
-) -> str:
+    output: Optional[BinaryIO] = None,
+) -> Union[str, BinaryIO]:
     """
     Generate a polished PDF groundwater report for a given state, district, and block.
     Optional flags:
@@ -49,24 +253,29 @@ def generate_report_pdf(
       - include_trends: include textual trend analysis
       - include_comparisons: include YoY comparison (latest vs previous year)
       - include_recommendations: include short recommendations (rule-based + NL)
+    The PDF is written to out_dir and its path returned, unless a writable binary
+    output (e.g. io.BytesIO) is given, in which case it is written there and
+    output is returned without touching the filesystem.
     """
-    try:
-        # Defensive copy
-        working = df.copy()
-        # Normalize columns expected by the code
-        for col in ["state", "district", "block", "season", "year", "water_level_m_bgl"]:
-            if col not in working.columns:
-                raise ValueError(f"Expected column '{col}' not found in dataframe")
-
-        # Filter data (case-insensitive) and handle location codes
-        data = working[
-            (working["state"].str.split('_').str[0].str.lower() == state.lower()) &
-            (working["district"].str.split('_').str[0].str.lower() == district.lower()) &
-            (working["block"].str.split('_').str[0].str.lower() == block.lower())
-        ]
-    except Exception as e:
-        logging.error(f"Error filtering data: {e}")
-        raise ValueError(f"Error filtering data: {e}")
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+    from reportlab.platypus.doctemplate import LayoutError
+    from svglib.svglib import svg2rlg
+
+    # Validate up front so the data paths below need no catch-all handlers
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        logging.error(f"Expected columns not found in dataframe: {missing}")
+        raise ValueError(f"Expected columns not found in dataframe: {missing}")
+
+    # Filter data (case-insensitive) and handle location codes;
+    # boolean indexing already returns a new frame, so df is never mutated
+    keys = _prepare_keys(df)
+    data = df[(
+        (keys["_state_key"] == state.lower()) &
+        (keys["_district_key"] == district.lower()) &
+        (keys["_block_key"] == block.lower())
+    ).to_numpy()]
 
     if data.empty:
         logging.error(f"No data found for {state} - {district} - {block}")
@@ -78,316 +287,275 @@ def generate_report_pdf(
     district_disp = first_row["district"]
     block_disp = first_row["block"]
 
-    try:
-        os.makedirs(out_dir, exist_ok=True)
-        filename = f"report_{district_disp}_{block_disp}.pdf"
-        filepath = os.path.join(out_dir, filename)
-    except Exception as e:
-        logging.error(f"Error creating output directory or file path: {e}")
-        raise ValueError(f"Error creating output directory or file path: {e}")
+    if output is None:
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+            filename = f"report_{district_disp}_{block_disp}.pdf"
+            output_target = os.path.join(out_dir, filename)
+        except OSError as e:
+            logging.error(f"Error creating output directory or file path: {e}")
+            raise ValueError(f"Error creating output directory or file path: {e}")
+    else:
+        output_target = output
 
     # Prepare numeric columns
-    try:
-        data = data.copy()
-        data["water_level_m_bgl"] = _safe_to_numeric(data["water_level_m_bgl"])
-        # Ensure year is numeric
-        data["year"] = _safe_to_numeric(data["year"]).astype("Int64")
-    except Exception as e:
-        logging.error(f"Error coercing numeric columns: {e}")
-        raise ValueError(f"Error coercing numeric columns: {e}")
-
-    # Prepare chart buffer (conditionally)
-    img_buf: Optional[io.BytesIO] = None
+    year = _safe_to_numeric(data["year"])
+    data = data.assign(
+        water_level_m_bgl=_safe_to_numeric(data["water_level_m_bgl"]),
+        # Normalized once to the fixed report seasons (anything else becomes
+        # missing, code -1); season selection then compares int8 codes
+        _season_norm=pd.Categorical(data["season"].str.strip().str.lower(), categories=_SEASON_CATEGORIES),
+    )
+    # Rows with a measured level, shared by every NaN-ignoring statistic
+    clean = data[data["water_level_m_bgl"].notna()]
+    # Rows with a year, as plain int32 (no nullable Int64 boxing), for the
+    # per-year aggregates and data period
+    has_year = year.notna()
+    dated = data[has_year].assign(year=year[has_year].astype(np.int32))
+
+    # Aggregate once per (year, season); chart, tables and recommendations slice this
+    # The per-year rollup only feeds the trend, YoY and recommendation sections
+    by_year_season, by_year = _aggregate_levels(
+        dated, per_year=include_trends or include_comparisons or include_recommendations
+    )
+
+    # Per-year means and latest vs previous year mean/min/max, computed once
+    # and shared by those sections
+    mean_by_year = yoy_stats = yoy_changes = None
+    if by_year is not None:
+        mean_by_year = by_year["mean"].to_numpy()
+        yoy_stats = by_year[["mean", "min", "max"]].to_numpy(dtype=float)[-2:]
+        if len(yoy_stats) == 2:
+            yoy_changes = _format_changes(yoy_stats[-1], yoy_stats[0])
+
+    # Prepare chart drawing (conditionally)
+    chart = None
     if include_charts:
         try:
-            plt.figure(figsize=(10, 6))
-            plt.grid(True, linestyle='--', alpha=0.7)
+            _, canvas, ax = _chart_template()
 
             # Plot both seasons if present
             plotted_any = False
-            for season, color in zip(["Pre-monsoon", "Post-monsoon"], ["#d62728", "#2ca02c"]):
-                df_season = data[data["season"].str.strip().str.lower() == season.lower()]
-                if not df_season.empty:
-                    grouped = df_season.groupby("year")["water_level_m_bgl"].agg(['mean', 'min', 'max']).sort_index()
+            for code, (season, color) in enumerate(zip(SEASONS, ["#d62728", "#2ca02c"])):
+                grouped = _season_slice(by_year_season, code)
+                if grouped is not None:
                     # Drop NA years
                     grouped = grouped.dropna(subset=['mean'])
                     if grouped.empty:
                         continue
-                    plt.plot(grouped.index.astype(int), grouped['mean'], marker='o', label=f"{season} (Mean)",
-                             color=color, linewidth=2, markersize=8)
-                    plt.fill_between(grouped.index.astype(int), grouped['min'], grouped['max'],
-                                     alpha=0.2, color=color, label=f"{season} (Range)")
+                    ax.plot(grouped.index.astype(int), grouped['mean'], marker='o', label=f"{season} (Mean)",
+                            color=color, linewidth=1.5, markersize=4)
+                    ax.fill_between(grouped.index.astype(int), grouped['min'], grouped['max'],
+                                    alpha=0.2, color=color, label=f"{season} (Range)")
                     plotted_any = True
 
             if not plotted_any:
                 # create a small placeholder plot to avoid exceptions later
-                plt.text(0.5, 0.5, 'No chartable data available', horizontalalignment='center', verticalalignment='center')
-
-            plt.xlabel("Year", fontsize=12, fontweight='bold')
-            plt.ylabel("Water Level (meters below ground level)", fontsize=12, fontweight='bold')
-            plt.title(f"Groundwater Level Trends: {block_disp}, {district_disp}",
-                      fontsize=14, fontweight='bold', pad=20)
-
-            plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-            plt.gca().invert_yaxis()  # Deeper levels shown lower on chart
-            plt.grid(True, which='both', linestyle='--', alpha=0.6)
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-
-            img_buf = io.BytesIO()
-            plt.savefig(img_buf, format='png', dpi=300, bbox_inches='tight')
-            plt.close()
-            img_buf.seek(0)
-        except Exception as e:
+                ax.text(0.5, 0.5, 'No chartable data available', horizontalalignment='center',
+                        verticalalignment='center', transform=ax.transAxes)
+
+            ax.set_title(f"Groundwater Level Trends: {block_disp}, {district_disp}",
+                         fontsize=9, fontweight='bold', pad=8)
+
+            ax.legend(bbox_to_anchor=(1.02, 1), loc='upper left', fontsize=6)
+
+            # Export as SVG and convert to a ReportLab drawing so the chart stays vector
+            svg_buf = io.BytesIO()
+            canvas.print_svg(svg_buf)
+            svg_buf.seek(0)
+            chart = svg2rlg(svg_buf)
+        except (ValueError, KeyError) as e:
             logging.warning(f"Chart generation failed, continuing without chart: {e}")
-            img_buf = None
+            chart = None
 
     # Build PDF
-    try:
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        styles = getSampleStyleSheet()
-        # small style for mono/notes
-        small = ParagraphStyle('small', parent=styles['Normal'], fontSize=9)
-        elements = []
-
-        # Title
-        elements.append(Paragraph(f"Groundwater Report – {district_disp}, {block_disp}", styles["Title"]))
-        elements.append(Spacer(1, 8))
+    styles, table_style = _report_styles()
+    doc = SimpleDocTemplate(output_target, pagesize=A4)
+    elements = []
+
+    # Title
+    elements.append(Paragraph(f"Groundwater Report – {district_disp}, {block_disp}", styles["Title"]))
+    elements.append(Spacer(1, 8))
+
+    # Metadata
+    meta = f"State: {state_disp}   District: {district_disp}   Block: {block_disp}   Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    elements.append(Paragraph(meta, styles["Normal"]))
+    elements.append(Spacer(1, 12))
+
+    # Key Statistics Section
+    elements.append(Paragraph("<b>Summary Statistics</b>", styles["Heading2"]))
+    elements.append(Spacer(1, 6))
+
+    # Calculate overall statistics (ignoring NaNs)
+    safe_series = clean["water_level_m_bgl"]
+    stats = safe_series.agg(["max", "min", "mean", "median"]) if not safe_series.empty else None
+    stats_table = [["Metric", "Water Level (m bgl)"]] + [
+        [metric, f"{stats[stat]:.2f}" if stats is not None else "-"]
+        for metric, stat in [
+            ("Deepest (max m bgl)", "max"),
+            ("Shallowest (min m bgl)", "min"),
+            ("Average (m bgl)", "mean"),
+            ("Median (m bgl)", "median"),
+        ]
+    ]
+
+    table = Table(stats_table, colWidths=[240, 200])
+    table.setStyle(table_style)
+    elements.append(table)
+    elements.append(Spacer(1, 12))
+
+    # Seasonal Analysis
+    elements.append(Paragraph("<b>Seasonal Analysis</b>", styles["Heading2"]))
+    elements.append(Spacer(1, 6))
+
+    table_data = [["Season", "Latest Year", "Mean Level", "Min Level", "Max Level", "Measurements"]]
+    for code, season in enumerate(SEASONS):
+        season_stats = _season_slice(by_year_season, code)
+        if season_stats is not None:
+            # drop years without measured levels
+            season_stats = season_stats[season_stats["count"] > 0]
+            if season_stats.empty:
+                table_data.append([season, "-", "-", "-", "-", "0"])
+                continue
+            last_year = int(season_stats.index.max())
+            last_year_stats = season_stats.loc[last_year]
+            table_data.append([
+                season,
+                str(last_year),
+                f"{last_year_stats['mean']:.2f}",
+                f"{last_year_stats['min']:.2f}",
+                f"{last_year_stats['max']:.2f}",
+                str(int(last_year_stats['count']))
+            ])
+        else:
+            table_data.append([season, "-", "-", "-", "-", "-"])
+
+    table = Table(table_data, colWidths=[100, 80, 80, 80, 80, 80])
+    table.setStyle(table_style)
+    elements.append(table)
+    elements.append(Spacer(1, 12))
+
+    # Trend Analysis
+    if include_trends:
+        elements.append(Paragraph("<b>Trend Analysis</b>", styles["Heading2"]))
+        elements.append(Spacer(1, 6))
 
-        # Metadata
-        meta = f"State: {state_disp}   District: {district_disp}   Block: {block_disp}   Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        elements.append(Paragraph(meta, styles["Normal"]))
-        elements.append(Spacer(1, 12))
+        if dated.empty:
+            trend_text = "No year information available to compute trends."
+        else:
+            latest_year = int(dated["year"].max())
+            earliest_year = int(dated["year"].min())
+            num_years = latest_year - earliest_year + 1 if latest_year and earliest_year else 0
+            trend_text = (
+                f"Data Period: {earliest_year} to {latest_year}\n"
+                f"Number of Years: {num_years}\n"
+                f"Total Measurements: {len(clean)}\n"
+            )
+
+            # Add a short numeric trend summary (slope approximation)
+            # from the mean per year across seasons
+            if len(mean_by_year) >= 2:
+                # simple slope
+                slope = mean_by_year[-1] - mean_by_year[0]
+                slope_text = f"Mean water level change from {int(by_year.index[0])} to {int(by_year.index[-1])}: {slope:.2f} m bgl."
+            else:
+                slope_text = "Insufficient years to compute slope-based trend."
+            trend_text += slope_text
 
-        # Key Statistics Section
-        elements.append(Paragraph("<b>Summary Statistics</b>", styles["Heading2"]))
-        elements.append(Spacer(1, 6))
+        elements.append(Paragraph(trend_text.replace("\n", "<br/>"), styles["Normal"]))
+        elements.append(Spacer(1, 8))
 
-        # Calculate overall statistics (ignoring NaNs)
-        safe_series = data["water_level_m_bgl"].dropna()
-        stats_overall = {
-            "Deepest (max m bgl)": f"{safe_series.max():.2f}" if not safe_series.empty else "-",
-            "Shallowest (min m bgl)": f"{safe_series.min():.2f}" if not safe_series.empty else "-",
-            "Average (m bgl)": f"{safe_series.mean():.2f}" if not safe_series.empty else "-",
-            "Median (m bgl)": f"{safe_series.median():.2f}" if not safe_series.empty else "-"
-        }
-
-        stats_table = [["Metric", "Water Level (m bgl)"]]
-        for metric, value in stats_overall.items():
-            stats_table.append([metric, value])
-
-        table = Table(stats_table, colWidths=[240, 200])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        elements.append(table)
+    # Insert chart image if available and requested
+    if include_charts and chart is not None:
+        elements.append(Paragraph("<b>Trend Chart</b>", styles["Heading3"]))
+        elements.append(Spacer(1, 6))
+        elements.append(chart)
         elements.append(Spacer(1, 12))
 
-        # Seasonal Analysis
-        elements.append(Paragraph("<b>Seasonal Analysis</b>", styles["Heading2"]))
+    # Year-over-Year Comparison (latest vs previous year)
+    if include_comparisons:
+        elements.append(Paragraph("<b>Year-over-Year Comparison (Latest vs Previous Year)</b>", styles["Heading2"]))
         elements.append(Spacer(1, 6))
+        if yoy_changes is not None:
+            change_text = [
+                ["Metric", str(int(by_year.index[-1])), str(int(by_year.index[-2])), "Change (m & %)" ]
+            ] + [
+                [metric, f"{latest:.2f}", f"{prev:.2f}", change]
+                for metric, latest, prev, change in zip(
+                    ["Mean", "Min", "Max"], yoy_stats[-1], yoy_stats[0], yoy_changes
+                )
+            ]
+        else:
+            change_text = [["Metric", "Year", "Value", "Note"], ["Mean", "-", "-", "Insufficient data for YoY comparison"]]
 
-        table_data = [["Season", "Latest Year", "Mean Level", "Min Level", "Max Level", "Measurements"]]
-        for season in ["Pre-monsoon", "Post-monsoon"]:
-            df_season = data[data["season"].str.strip().str.lower() == season.lower()]
-            if not df_season.empty:
-                # drop NaN levels
-                df_season = df_season.dropna(subset=["water_level_m_bgl"])
-                if df_season.empty:
-                    table_data.append([season, "-", "-", "-", "-", "0"])
-                    continue
-                last_year = int(df_season["year"].max())
-                last_year_data = df_season[df_season["year"] == last_year]
-                table_data.append([
-                    season,
-                    str(last_year),
-                    f"{last_year_data['water_level_m_bgl'].mean():.2f}",
-                    f"{last_year_data['water_level_m_bgl'].min():.2f}",
-                    f"{last_year_data['water_level_m_bgl'].max():.2f}",
-                    str(len(last_year_data))
-                ])
-            else:
-                table_data.append([season, "-", "-", "-", "-", "-"])
-
-        table = Table(table_data, colWidths=[100, 80, 80, 80, 80, 80])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
+        table = Table(change_text, colWidths=[140, 100, 100, 140])
+        table.setStyle(table_style)
         elements.append(table)
         elements.append(Spacer(1, 12))
 
-        # Trend Analysis
-        if include_trends:
-            elements.append(Paragraph("<b>Trend Analysis</b>", styles["Heading2"]))
-            elements.append(Spacer(1, 6))
-
-            years = data["year"].dropna().unique()
-            if len(years) == 0:
-                trend_text = "No year information available to compute trends."
+    # Recommendations (placed immediately after Trend Analysis)
+    if include_recommendations:
+        elements.append(Paragraph("<b>Recommendations</b>", styles["Heading2"]))
+        elements.append(Spacer(1, 6))
+        recs = []
+        # Basic rule-based checks
+        if yoy_changes is not None:
+            prev_year = int(by_year.index[-2])
+            mean_diff = mean_by_year[-1] - mean_by_year[-2]
+            mean_change = yoy_changes[0]
+            # Decline means larger m bgl (deeper below ground) — i.e., groundwater falling
+            if mean_diff > 0.25:
+                recs.append(f"- Mean groundwater level has worsened by {mean_change} since {prev_year}. Consider implementing groundwater recharge measures (check dams, infiltration wells).")
+            elif mean_diff < -0.25:
+                recs.append(f"- Mean groundwater level has improved by {mean_change} since {prev_year}. Continue monitoring and sustaining recharge practices.")
             else:
-                latest_year = int(data["year"].max())
-                earliest_year = int(data["year"].min())
-                num_years = latest_year - earliest_year + 1 if latest_year and earliest_year else 0
-                trend_text = (
-                    f"Data Period: {earliest_year} to {latest_year}\n"
-                    f"Number of Years: {num_years}\n"
-                    f"Total Measurements: {len(data.dropna(subset=['water_level_m_bgl']))}\n"
-                )
-
-                # Add a short numeric trend summary (slope approximation)
-                try:
-                    # compute mean per year across seasons
-                    mean_by_year = data.dropna(subset=["water_level_m_bgl"]).groupby("year")["water_level_m_bgl"].mean().sort_index()
-                    if len(mean_by_year) >= 2:
-                        # simple slope
-                        slope = mean_by_year.iloc[-1] - mean_by_year.iloc[0]
-                        slope_text = f"Mean water level change from {int(mean_by_year.index[0])} to {int(mean_by_year.index[-1])}: {slope:.2f} m bgl."
-                    else:
-                        slope_text = "Insufficient years to compute slope-based trend."
-                    trend_text += slope_text
-                except Exception:
-                    trend_text += "Trend computation not available."
-
-            elements.append(Paragraph(trend_text.replace("\n", "<br/>"), styles["Normal"]))
-            elements.append(Spacer(1, 8))
-
-        # Insert chart image if available and requested
-        if include_charts and img_buf is not None:
-            try:
-                elements.append(Paragraph("<b>Trend Chart</b>", styles["Heading3"]))
-                elements.append(Spacer(1, 6))
-                elements.append(Image(img_buf, width=450, height=250))
-                elements.append(Spacer(1, 12))
-            except Exception as e:
-                logging.warning(f"Failed to insert chart image in PDF: {e}")
-
-        # Year-over-Year Comparison (latest vs previous year)
-        if include_comparisons:
-            elements.append(Paragraph("<b>Year-over-Year Comparison (Latest vs Previous Year)</b>", styles["Heading2"]))
-            elements.append(Spacer(1, 6))
-            try:
-                by_year = data.dropna(subset=["water_level_m_bgl"]).groupby("year")["water_level_m_bgl"].agg(['mean', 'min', 'max'])
-                by_year = by_year.sort_index()
-                if len(by_year) >= 2:
-                    latest = by_year.iloc[-1]
-                    prev = by_year.iloc[-2]
-                    change_mean = latest['mean'] - prev['mean']
-                    change_text = [
-                        ["Metric", str(int(by_year.index[-1])), str(int(by_year.index[-2])), "Change (m & %)" ],
-                        ["Mean", f"{latest['mean']:.2f}", f"{prev['mean']:.2f}", _format_change(latest['mean'], prev['mean'])],
-                        ["Min", f"{latest['min']:.2f}", f"{prev['min']:.2f}", _format_change(latest['min'], prev['min'])],
-                        ["Max", f"{latest['max']:.2f}", f"{prev['max']:.2f}", _format_change(latest['max'], prev['max'])]
-                    ]
+                recs.append(f"- Mean groundwater level is relatively stable YoY ({mean_change}). Continue periodic monitoring.")
+
+            # Check for consistent multi-year decline (3+ years);
+            # increasing m bgl => declining water table
+            if len(mean_by_year) >= 3 and np.all(np.diff(mean_by_year[-3:]) >= 0):
+                recs.append("- Groundwater shows a consistent decline over the past 3 years. Immediate recharge and demand-management measures recommended.")
+        else:
+            recs.append("- Insufficient yearly mean data to make strong recommendations. Consider improving monitoring density.")
+
+        # Seasonal recovery check (pre vs post monsoon), on the latest year
+        # each season was measured, if that is the same year for both
+        pre = _season_slice(by_year_season, 0)
+        post = _season_slice(by_year_season, 1)
+        if pre is not None and post is not None:
+            latest_year = pre["mean"].last_valid_index()
+            if latest_year is not None and latest_year == post["mean"].last_valid_index():
+                recovery = pre.at[latest_year, "mean"] - post.at[latest_year, "mean"]  # positive means post-monsoon shallower (good)
+                if recovery < 0.5:
+                    recs.append("- Post-monsoon recovery is weak (<0.5 m). Strengthen recharge practices and watershed measures.")
                 else:
-                    change_text = [["Metric", "Year", "Value", "Note"], ["Mean", "-", "-", "Insufficient data for YoY comparison"]]
-
-                table = Table(change_text, colWidths=[140, 100, 100, 140])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ]))
-                elements.append(table)
-                elements.append(Spacer(1, 12))
-            except Exception as e:
-                logging.warning(f"YoY comparison failed: {e}")
-                elements.append(Paragraph("Year-over-Year comparison not available due to insufficient data.", small))
-                elements.append(Spacer(1, 8))
-
-        # Recommendations (placed immediately after Trend Analysis)
-        if include_recommendations:
-            elements.append(Paragraph("<b>Recommendations</b>", styles["Heading2"]))
+                    recs.append("- Post-monsoon recovery appears adequate. Maintain recharge & conservation measures.")
+
+        # Natural language summary (concise)
+        nl_summary = []
+        if len(mean_by_year) >= 2:
+            trend_direction = mean_by_year[-1] - mean_by_year[0]
+            if trend_direction > 0.5:
+                nl_summary.append("Overall, the groundwater levels indicate a notable declining trend over the recorded period.")
+            elif trend_direction < -0.5:
+                nl_summary.append("Overall, groundwater levels show a notable improvement across the period.")
+            else:
+                nl_summary.append("Overall, groundwater levels are relatively stable over the recorded period.")
+
+        # Add recommendations into PDF
+        if recs:
+            for r in recs:
+                elements.append(Paragraph(r, styles["Normal"]))
+                elements.append(Spacer(1, 4))
+        if nl_summary:
             elements.append(Spacer(1, 6))
-            try:
-                recs = []
-                # Basic rule-based checks
-                mean_by_year = data.dropna(subset=["water_level_m_bgl"]).groupby("year")["water_level_m_bgl"].mean().sort_index()
-                if len(mean_by_year) >= 2:
-                    latest_year = int(mean_by_year.index[-1])
-                    prev_year = int(mean_by_year.index[-2])
-                    latest_mean = mean_by_year.iloc[-1]
-                    prev_mean = mean_by_year.iloc[-2]
-                    # Decline means larger m bgl (deeper below ground) — i.e., groundwater falling
-                    if latest_mean - prev_mean > 0.25:
-                        recs.append(f"- Mean groundwater level has worsened by {_format_change(latest_mean, prev_mean)} since {prev_year}. Consider implementing groundwater recharge measures (check dams, infiltration wells).")
-                    elif latest_mean - prev_mean < -0.25:
-                        recs.append(f"- Mean groundwater level has improved by {_format_change(latest_mean, prev_mean)} since {prev_year}. Continue monitoring and sustaining recharge practices.")
-                    else:
-                        recs.append(f"- Mean groundwater level is relatively stable YoY ({_format_change(latest_mean, prev_mean)}). Continue periodic monitoring.")
-
-                    # Check for consistent multi-year decline (3+ years)
-                    if len(mean_by_year) >= 3:
-                        last3 = mean_by_year.tail(3)
-                        if last3.is_monotonic_increasing:  # increasing m bgl => declining water table
-                            recs.append("- Groundwater shows a consistent decline over the past 3 years. Immediate recharge and demand-management measures recommended.")
-                else:
-                    recs.append("- Insufficient yearly mean data to make strong recommendations. Consider improving monitoring density.")
-
-                # Seasonal recovery check (pre vs post monsoon)
-                try:
-                    pre = data[data["season"].str.strip().str.lower() == "pre-monsoon"].dropna(subset=["water_level_m_bgl"])
-                    post = data[data["season"].str.strip().str.lower() == "post-monsoon"].dropna(subset=["water_level_m_bgl"])
-                    if not pre.empty and not post.empty:
-                        # compare latest year averages for pre vs post
-                        pre_latest_year = int(pre["year"].max())
-                        post_latest_year = int(post["year"].max())
-                        # If data aligns on same year, compute recovery
-                        if pre_latest_year == post_latest_year:
-                            pre_mean = pre[pre["year"] == pre_latest_year]["water_level_m_bgl"].mean()
-                            post_mean = post[post["year"] == post_latest_year]["water_level_m_bgl"].mean()
-                            recovery = pre_mean - post_mean  # positive means post-monsoon shallower (good)
-                            if recovery < 0.5:
-                                recs.append("- Post-monsoon recovery is weak (<0.5 m). Strengthen recharge practices and watershed measures.")
-                            else:
-                                recs.append("- Post-monsoon recovery appears adequate. Maintain recharge & conservation measures.")
-                except Exception:
-                    # Non-fatal
-                    pass
-
-                # Natural language summary (concise)
-                nl_summary = []
-                try:
-                    if 'mean_by_year' in locals() and len(mean_by_year) >= 2:
-                        trend_direction = mean_by_year.iloc[-1] - mean_by_year.iloc[0]
-                        if trend_direction > 0.5:
-                            nl_summary.append("Overall, the groundwater levels indicate a notable declining trend over the recorded period.")
-                        elif trend_direction < -0.5:
-                            nl_summary.append("Overall, groundwater levels show a notable improvement across the period.")
-                        else:
-                            nl_summary.append("Overall, groundwater levels are relatively stable over the recorded period.")
-                except Exception:
-                    pass
-
-                # Add recommendations into PDF
-                if recs:
-                    for r in recs:
-                        elements.append(Paragraph(r, styles["Normal"]))
-                        elements.append(Spacer(1, 4))
-                if nl_summary:
-                    elements.append(Spacer(1, 6))
-                    elements.append(Paragraph("<b>Summary:</b> " + " ".join(nl_summary), styles["Normal"]))
-                elements.append(Spacer(1, 12))
-            except Exception as e:
-                logging.warning(f"Recommendations generation failed: {e}")
-                elements.append(Paragraph("Recommendations not available.", small))
-                elements.append(Spacer(1, 8))
-
-        # Build the document
+            elements.append(Paragraph("<b>Summary:</b> " + " ".join(nl_summary), styles["Normal"]))
+        elements.append(Spacer(1, 12))
+
+    # Build the document
+    try:
         doc.build(elements)
-        return filepath
-    except Exception as e:
+    except (LayoutError, OSError) as e:
         logging.error(f"Error building PDF: {e}")
         raise ValueError(f"Error building PDF: {e}")
+    return output_target